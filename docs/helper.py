@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def _read_netpbm_header(f):
     """Read magic, width, height, maxval from an open binary PBM/PGM/PPM file."""
     def read_non_comment():
@@ -17,7 +20,6 @@ def _read_netpbm_header(f):
 
 def read_pgm_p5(filename):
     """Read a binary PGM (P5) file and return a 2-D numpy uint8 array (height x width)."""
-    import numpy as np
     with open(filename, "rb") as f:
         magic, width, height = _read_netpbm_header(f)
         if magic != b"P5":
@@ -29,19 +31,16 @@ def read_pgm_p5(filename):
 
 def read_ppm_p6(filename):
     """Read a binary PPM (P6) file and return a 3-D numpy uint8 array (height x width x 3)."""
-    import numpy as np
     with open(filename, "rb") as f:
         magic, width, height = _read_netpbm_header(f)
         if magic != b"P6":
             raise ValueError(f"Kein P6-Format, gefunden: {magic}")
-        data = f.read(width * height * 3)
-    img = np.frombuffer(data, dtype=np.uint8).reshape((height, width, 3))
-    return img
+        img = np.fromfile(f, dtype=np.uint8, count=width * height * 3)
+    return img.reshape((height, width, 3))
 
 
 def read_ppm_auto(filename):
     """Detect P5 or P6 automatically and return an appropriate numpy array."""
-    import numpy as np
     with open(filename, "rb") as f:
         magic, width, height = _read_netpbm_header(f)
         if magic == b"P5":
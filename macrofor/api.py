@@ -6,7 +6,12 @@ fragments as `str`. Later they can be adapted to build AST nodes.
 """
 from __future__ import annotations
 from typing import Iterable, Optional
+import contextlib
+import io
+import itertools
+import os
 import re
+import tempfile
 
 
 # ============================================================================
@@ -20,23 +25,46 @@ class FortranStyle:
         format: 'fixed' (F77) or 'free' (F90+).
         comment_char: Comment character ('c' for F77, '!' for F90+).
         max_line_length: Maximum line length (72 for F77, 132 for F90+).
+        comment_prefix: Prefix used by commentf() ('c     ' for F77, '!    ' for F90+).
+            Follows comment_char.
+        block_indent: Indentation added to nested block bodies ('' for F77, '  ' for F90+).
+            Follows format.
     """
+    # Attribute values for each style, applied in one place by _apply()
+    _F77 = {
+        'format': 'fixed',
+        'comment_char': 'c',
+        'max_line_length': 72,
+    }
+    _F90 = {
+        'format': 'free',
+        'comment_char': '!',
+        'max_line_length': 132,
+    }
+
     def __init__(self):
-        self.format = 'fixed'
-        self.comment_char = 'c'
-        self.max_line_length = 72
+        self._apply(self._F77)
+    
+    def _apply(self, settings: dict):
+        for name, value in settings.items():
+            setattr(self, name, value)
+    
+    def __setattr__(self, name, value):
+        # Recompute the derived attributes on every assignment, so they also
+        # follow format or comment_char when these are changed by hand
+        object.__setattr__(self, name, value)
+        if name == 'comment_char':
+            object.__setattr__(self, 'comment_prefix', 'c     ' if value == 'c' else '!    ')
+        elif name == 'format':
+            object.__setattr__(self, 'block_indent', '' if value == 'fixed' else '  ')
     
     def use_f77(self):
         """Switch to Fortran 77 fixed format style."""
-        self.format = 'fixed'
-        self.comment_char = 'c'
-        self.max_line_length = 72
+        self._apply(self._F77)
     
     def use_f90(self):
         """Switch to Fortran 90+ free format style."""
-        self.format = 'free'
-        self.comment_char = '!'
-        self.max_line_length = 132
+        self._apply(self._F90)
     
     def set_style(self, style: str):
         """Set style by name ('f77' or 'f90').
@@ -95,8 +123,42 @@ def get_fortran_style() -> FortranStyle:
     return _fortran_style
 
 
-# Global label counter for automatic label management
-_label_counter = 0
+@contextlib.contextmanager
+def fortran_style(style: str):
+    """Temporarily switch the global Fortran style.
+    
+    The previous style (including any attributes changed by hand) is
+    restored when the block exits, even if it raises.
+    
+    Args:
+        style: Style name, as for set_fortran_style().
+    
+    Example:
+        >>> with fortran_style('f90'):
+        ...     genfor('modern.f90', [programm('main', [...])])
+    """
+    saved = dict(vars(_fortran_style))
+    set_fortran_style(style)
+    try:
+        yield _fortran_style
+    finally:
+        _fortran_style._apply(saved)
+
+
+# Fixed statements returned by the zero-argument helpers
+_ELSE = "else"
+_ENDIF = "end if"
+_RETURN = "return"
+
+
+# Global label counter for automatic label management. next() on an
+# itertools.count is atomic, so helpers may be called from several threads
+# without handing out the same placeholder twice.
+_label_counter = itertools.count(1)
+
+# Matches label placeholders emitted by _get_next_label_placeholder(). The
+# capturing group makes split() keep the placeholders at the odd indices.
+_LABEL_RE = re.compile(r'(__LABEL_\d+__)')
 
 
 def _get_next_label_placeholder() -> str:
@@ -104,23 +166,33 @@ def _get_next_label_placeholder() -> str:
     
     Each call to dom(), if_then_m(), etc. receives a unique placeholder
     that will be replaced by genfor() with a sequential number.
+    
+    The __LABEL_N__ spelling is visible in the raw output of the macros
+    (see the dom/readm/writem/formatf docstrings), so it must stay stable.
+    Callers format it once and reuse the string for both label positions.
     """
-    global _label_counter
-    _label_counter += 1
-    return f"__LABEL_{_label_counter}__"
+    return f"__LABEL_{next(_label_counter)}__"
 
 
 def _reset_label_counter():
-    """Reset the label counter (called by genfor at the start of file generation)."""
+    """Reset the label counter.
+    
+    Only meant for tests that want predictable placeholders. genfor() does not
+    call it: it numbers labels by order of appearance, so placeholders only
+    have to be unique, and resetting could make statements built before and
+    after the reset (e.g. in another thread) share a placeholder.
+    """
     global _label_counter
-    _label_counter = 0
+    _label_counter = itertools.count(1)
 
 
-def _replace_label_placeholders(code: str) -> str:
+def _replace_label_placeholders(code: str, mapping: Optional[dict] = None) -> str:
     """Replace __LABEL_N__ placeholders with sequential numbers (100, 200, 300, ...).
     
     Args:
         code: Fortran source code with label placeholders.
+        mapping: Optional placeholder -> label dict shared between calls, so that
+            consecutive chunks of one file continue the same label sequence.
     
     Returns:
         Fortran source code with placeholders replaced by sequential labels.
@@ -129,30 +201,63 @@ def _replace_label_placeholders(code: str) -> str:
         Input:  "do __LABEL_1__ i=1,10\\n  x=1\\n__LABEL_1__ continue"
         Output: "do 100 i=1,10\\n  x=1\\n100 continue"
     """
-    # Find all unique placeholders in order of appearance
-    placeholders = []
-    for match in re.finditer(r'__LABEL_\d+__', code):
-        placeholder = match.group(0)
-        if placeholder not in placeholders:
-            placeholders.append(placeholder)
+    # Labels cannot be numbered when the helpers run: nested blocks are built
+    # inside-out (the inner dom() is evaluated before the outer one), but the
+    # labels must increase in order of appearance in the final file.
     
-    # Replace each unique placeholder with a sequential label (100, 200, 300, ...)
-    result = code
-    for i, placeholder in enumerate(placeholders, start=1):
-        label = str(100 * i)
-        result = result.replace(placeholder, label)
+    # Most statements contain no label at all
+    if "__LABEL_" not in code:
+        return code
     
-    return result
+    # Split once at C level; this avoids a Python callback per match
+    parts = _LABEL_RE.split(code)
+    placeholders = parts[1::2]
+    
+    # Assign sequential labels (100, 200, 300, ...) in order of first appearance
+    if mapping is None:
+        mapping = {}
+    for placeholder in dict.fromkeys(placeholders):
+        if placeholder not in mapping:
+            mapping[placeholder] = str(100 * (len(mapping) + 1))
+    parts[1::2] = [mapping[placeholder] for placeholder in placeholders]
+    return "".join(parts)
 
 
 def _normalize_list_arg(lst) -> str:
-    """Turn a Python list/tuple or comma-separated string into a Fortran list string."""
+    """Turn a Python iterable or comma-separated string into a Fortran list string.
+
+    Items of lists, tuples and other iterables (e.g. generators) are joined
+    with ', '; strings are passed through stripped.
+
+    Raises:
+        TypeError: For sets (no stable item order) and bytes/bytearray.
+    """
+    t = type(lst)
+    if t is str:
+        return lst.strip()
     if lst is None:
         return ''
-    if isinstance(lst, (list, tuple)):
-        return ', '.join(str(x).strip() for x in lst)
-    # assume string
-    return str(lst).strip()
+    if not (t is list or t is tuple or isinstance(lst, (list, tuple))):
+        if isinstance(lst, str):
+            # str subclasses (e.g. numpy.str_) are strings, not item iterables
+            return lst.strip()
+        if isinstance(lst, (set, frozenset, bytes, bytearray)):
+            raise TypeError(
+                f"list argument must be a sequence, iterator or string, "
+                f"not {type(lst).__name__}")
+        try:
+            lst = tuple(lst)
+        except TypeError:
+            # any other object is rendered via str()
+            return str(lst).strip()
+    # Empty and single-item lists need no join
+    if not lst:
+        return ''
+    if len(lst) == 1:
+        return str(lst[0]).strip()
+    # str.strip() returns the item itself when there is nothing to strip, so an
+    # explicit whitespace check up front would only add work for clean items.
+    return ', '.join([str(x).strip() for x in lst])
 
 
 def callf(name: str, list: Iterable[str]) -> str:
@@ -214,10 +319,7 @@ def commentf(string: str) -> str:
         >>> commentf('calculate derivatives')
         '!    calculate derivatives'
     """
-    if _fortran_style.comment_char == 'c':
-        return f"c     {string}"
-    else:
-        return f"!    {string}"
+    return f"{_fortran_style.comment_prefix}{string}"
 
 
 def commonf(name: str, list: Iterable[str]) -> str:
@@ -277,14 +379,13 @@ def declaref(type: str, list: Iterable[str]) -> str:
         >>> declaref('implicit real*8', ['a-h', 'o-z'])
         'implicit real*8(a-h,o-z)'
     """
-    names = _normalize_list_arg(list)
-    
     # Special handling for implicit statements: use parentheses and no spaces after commas
-    if type.lower().startswith('implicit'):
+    if type[:1] in 'iI' and type[:8].lower() == 'implicit':
         # Remove spaces after commas for implicit statements
-        names_compact = names.replace(', ', ',')
+        names_compact = _normalize_list_arg(list).replace(', ', ',')
         return f"{type}({names_compact})"
     
+    names = _normalize_list_arg(list)
     return f"{type} {names}"
 
 
@@ -311,12 +412,13 @@ def dof(label: Optional[str], index: str, start, end, step=None) -> str:
         'do j = 1, 50, 2'
     """
     # label optional; Fortran DO can be without label in free form
-    rng = f"{index}={start}, {end}"
-    if step is not None:
-        rng += f", {step}"
     if label:
-        return f"do {label}, {rng}"
-    return f"do {index} = {start}, {end}" + (f", {step}" if step is not None else "")
+        if step is not None:
+            return f"do {label}, {index}={start}, {end}, {step}"
+        return f"do {label}, {index}={start}, {end}"
+    if step is not None:
+        return f"do {index} = {start}, {end}, {step}"
+    return f"do {index} = {start}, {end}"
 
 
 def if_then_f(condition: str) -> str:
@@ -349,7 +451,7 @@ def elsef() -> str:
         >>> elsef()
         'else'
     """
-    return "else"
+    return _ELSE
 
 
 def endiff() -> str:
@@ -364,7 +466,7 @@ def endiff() -> str:
         >>> endiff()
         'end if'
     """
-    return "end if"
+    return _ENDIF
 
 
 def equalf(variable: str, expression: str) -> str:
@@ -566,7 +668,7 @@ def returnf() -> str:
         >>> returnf()
         'return'
     """
-    return "return"
+    return _RETURN
 
 
 def subroutinef(name: str, list: Iterable[str]) -> str:
@@ -626,6 +728,10 @@ def writef(file: str, label: Optional[str], list: Iterable[str]) -> str:
 # Macro functions (*m): generate multi-line blocks with indentation
 # ============================================================================
 
+# Whitespace-only line between two other lines (emptied by _indent_lines)
+_INNER_BLANK_LINE_RE = re.compile(r'\n[^\S\n]*\n')
+
+
 def _indent_lines(text: str, indent: str = None) -> str:
     """Indent all non-empty lines in text.
     
@@ -636,16 +742,21 @@ def _indent_lines(text: str, indent: str = None) -> str:
     if indent is None:
         # F77: No indentation (all statements must be in column 7)
         # F90: 2-space indentation for nested blocks
-        if _fortran_style.format == 'fixed':
-            return text  # No additional indentation for F77
-        else:
-            indent = "  "  # 2-space indent for F90
+        indent = _fortran_style.block_indent
     
     if not indent:  # If indent is empty, return text unchanged
         return text
     
+    # Common case: no blank lines, so indenting is a single C-level replace.
+    # Inner blank lines are found by one literal-anchored regex search; the
+    # first and last line are checked directly.
+    if (_INNER_BLANK_LINE_RE.search(text) is None
+            and text.partition("\n")[0].strip()
+            and text.rpartition("\n")[2].strip()):
+        return indent + text.replace("\n", "\n" + indent)
+    
     lines = text.split("\n")
-    return "\n".join(indent + line if line.strip() else "" for line in lines)
+    return "\n".join([indent + line if line.strip() else "" for line in lines])
 
 
 def _body_to_text(body_list) -> str:
@@ -653,10 +764,29 @@ def _body_to_text(body_list) -> str:
     if isinstance(body_list, str):
         return body_list
     if isinstance(body_list, (list, tuple)):
-        return "\n".join(str(line) for line in body_list)
+        # Bodies are nearly always plain strings: join them directly and only
+        # convert the items when join() finds something that is not a str
+        try:
+            return "\n".join(body_list)
+        except TypeError:
+            return "\n".join(map(str, body_list))
     return str(body_list)
 
 
+def _join_indented(body_list) -> str:
+    """Join a block body and indent it for the current style in one step.
+
+    Body items may themselves span several lines (nested blocks), so the body
+    is joined first and then indented with a single pass over the text.
+    F77 bodies are not indented at all and skip that pass.
+    """
+    text = _body_to_text(body_list)
+    indent = _fortran_style.block_indent
+    if not indent:
+        return text
+    return _indent_lines(text, indent)
+
+
 def dom(index: str, start, end, do_list, step=None) -> str:
     """do label index=start, end, step
     	do_list
@@ -685,14 +815,14 @@ def dom(index: str, start, end, do_list, step=None) -> str:
     # Generate a unique label placeholder (will be replaced by genfor)
     label = _get_next_label_placeholder()
     
-    rng = f"{index}={start}, {end}"
     if step is not None:
-        rng += f", {step}"
+        rng = f"{index}={start}, {end}, {step}"
+    else:
+        rng = f"{index}={start}, {end}"
     
-    body_text = _body_to_text(do_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(do_list)
     
-    return f"do {label} {rng}\n{body_indented}\n{label} continue"
+    return "\n".join((f"do {label} {rng}", body_indented, f"{label} continue"))
 
 
 def functionm(type: str, name: str, list: Iterable[str], body_list) -> str:
@@ -716,10 +846,9 @@ def functionm(type: str, name: str, list: Iterable[str], body_list) -> str:
         'real function square(x)\\n  real :: x\\n  square = x*x\\nend'
     """
     args = _normalize_list_arg(list)
-    body_text = _body_to_text(body_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(body_list)
     
-    return f"{type} function {name}({args})\n{body_indented}\nend"
+    return "\n".join((f"{type} function {name}({args})", body_indented, "end"))
 
 
 def if_then_m(condition: str, then_list) -> str:
@@ -740,10 +869,9 @@ def if_then_m(condition: str, then_list) -> str:
         >>> if_then_m('x .gt. 0', ['a = 1', 'b = 2'])
         'if (x .gt. 0) then\\n  a = 1\\n  b = 2\\nend if'
     """
-    body_text = _body_to_text(then_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(then_list)
     
-    return f"if ({condition}) then\n{body_indented}\nend if"
+    return "\n".join((f"if ({condition}) then", body_indented, _ENDIF))
 
 
 def if_then_else_m(condition: str, then_list, else_list) -> str:
@@ -767,12 +895,10 @@ def if_then_else_m(condition: str, then_list, else_list) -> str:
         >>> if_then_else_m('n .eq. 0', ['y = 1'], ['y = 0'])
         'if (n .eq. 0) then\\n  y = 1\\nelse\\n  y = 0\\nend if'
     """
-    then_text = _body_to_text(then_list)
-    else_text = _body_to_text(else_list)
-    then_indented = _indent_lines(then_text)
-    else_indented = _indent_lines(else_text)
+    then_indented = _join_indented(then_list)
+    else_indented = _join_indented(else_list)
     
-    return f"if ({condition}) then\n{then_indented}\nelse\n{else_indented}\nend if"
+    return "\n".join((f"if ({condition}) then", then_indented, _ELSE, else_indented, _ENDIF))
 
 
 def programm(name: str, body_list) -> str:
@@ -793,10 +919,9 @@ def programm(name: str, body_list) -> str:
         >>> programm('hello', ['implicit none', 'print *, \"Hi\"'])
         'program hello\\n  implicit none\\n  print *, \"Hi\"\\nend'
     """
-    body_text = _body_to_text(body_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(body_list)
     
-    return f"program {name}\n{body_indented}\nend"
+    return "\n".join((f"program {name}", body_indented, "end"))
 
 
 def subroutinem(name: str, list: Iterable[str], body_list) -> str:
@@ -826,11 +951,11 @@ def subroutinem(name: str, list: Iterable[str], body_list) -> str:
         '!\\n! SUBROUTINE compute\\n!\\nsubroutine compute(x, y)\\n  integer :: i\\n  i = x + y\\nend subroutine compute'
     """
     args = _normalize_list_arg(list)
-    body_text = _body_to_text(body_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(body_list)
     c = _fortran_style.comment_char
+    header = f"{c}\n{c} SUBROUTINE {name}\n{c}\nsubroutine {name}({args})"
     
-    return f"{c}\n{c} SUBROUTINE {name}\n{c}\nsubroutine {name}({args})\n{body_indented}\nend subroutine {name}"
+    return "\n".join((header, body_indented, f"end subroutine {name}"))
 
 
 def openm(unit: str, file: str, status: str, body_list, access: str = None) -> str:
@@ -856,13 +981,13 @@ def openm(unit: str, file: str, status: str, body_list, access: str = None) -> s
         >>> openm('11', 'output.txt', 'old', ['write(11) results'], 'append')
         \"open(unit=11, file='output.txt', status='old', access='append')\\n  write(11) results\\nclose(unit=11)\"
     """
-    body_text = _body_to_text(body_list)
-    body_indented = _indent_lines(body_text)
+    body_indented = _join_indented(body_list)
     
     if access:
-        return f"open(unit={unit}, file='{file}', status='{status}', access='{access}')\n{body_indented}\nclose(unit={unit})"
+        header = f"open(unit={unit}, file='{file}', status='{status}', access='{access}')"
     else:
-        return f"open(unit={unit}, file='{file}', status='{status}')\n{body_indented}\nclose(unit={unit})"
+        header = f"open(unit={unit}, file='{file}', status='{status}')"
+    return "\n".join((header, body_indented, f"close(unit={unit})"))
 
 
 def readm(file: str, format_list: Iterable[str], var_list: Iterable[str]) -> str:
@@ -959,6 +1084,19 @@ def declarem(type: str, list: Iterable[str]) -> str:
     return f"{type} {names}"
 
 
+# Statement with a leading numeric label, e.g. "100 continue"
+_LABELED_STMT_RE = re.compile(r'^\s*(\d+)\s+(.+)')
+
+# Characters that can start a comment line
+_COMMENT_CHARS = frozenset('!cC*')
+
+# Indented line holding nothing but a comment character
+_INDENTED_BARE_COMMENT_RE = re.compile(r'^[^\S\n]+[!cC*]$', re.M)
+
+# Preferred places to break long lines, tried in order
+_SPLIT_CANDIDATES = (', ', ',', ' + ', ' - ', ' * ', '/', '(', ' .and. ', ' .or. ')
+
+
 def _wrap_long_lines(code: str, max_length: int = 72, format_style: str = 'fixed') -> str:
     """Wrap Fortran lines longer than max_length using continuation characters.
     
@@ -972,44 +1110,60 @@ def _wrap_long_lines(code: str, max_length: int = 72, format_style: str = 'fixed
     Returns:
         Code with wrapped lines and proper indentation.
     """
+    # Resolve the style once instead of comparing strings for every line
+    fixed = format_style == 'fixed'
+    
     lines = code.split('\n')
+    
+    # Free format only changes lines that are too long (and unindents bare
+    # comment characters); F77 still has to re-indent statements, labels and
+    # comments even when nothing is wrapped
+    if (not fixed and max(map(len, lines)) <= max_length
+            and _INDENTED_BARE_COMMENT_RE.search(code) is None):
+        return code
+    
     wrapped = []
+    append = wrapped.append  # bound once; called for every output line
     
     # F77 fixed format: statements must start in column 7 (6 spaces)
-    f77_indent = '      ' if format_style == 'fixed' else ''
+    f77_indent = '      ' if fixed else ''
     
     for line in lines:
         # Skip empty lines
         if not line.strip():
-            wrapped.append(line)
+            append(line)
             continue
             
         # Skip Fortran comments (must be at start of line, possibly with whitespace)
+        # ('!...', 'c ...', 'C ...', '* ...', 'c<tab>...', 'C<tab>...'). Most lines
+        # are rejected on their first character alone.
         stripped = line.lstrip()
-        if stripped.startswith(('!', 'c ', 'C ', '* ', 'c\t', 'C\t')):
-            # For F77, ensure comment char is in column 1 (no indentation for comments)
-            if format_style == 'fixed' and not line.startswith(('c', 'C', '*', '!')):
-                wrapped.append(stripped)
-            else:
-                wrapped.append(line)
-            continue
-        # Also check for comment-only lines (just 'c', 'C', or '*')
-        if stripped in ('c', 'C', '*', '!'):
-            wrapped.append(stripped)
-            continue
+        first = stripped[0]
+        if first in _COMMENT_CHARS:
+            second = stripped[1:2]
+            if first == '!' or second == ' ' or (second == '\t' and first != '*'):
+                # For F77, ensure comment char is in column 1 (no indentation for comments)
+                if fixed and line[0] not in _COMMENT_CHARS:
+                    append(stripped)
+                else:
+                    append(line)
+                continue
+            # Also check for comment-only lines (just 'c', 'C', or '*')
+            if not second:
+                append(stripped)
+                continue
         
         # For F77 fixed format, handle labels and indentation
-        if format_style == 'fixed':
+        if fixed:
             # Check if line starts with a label (digits followed by space)
             # Labels must be in columns 1-5 (no indentation)
-            import re
-            label_match = re.match(r'^\s*(\d+)\s+(.+)', line)
+            label_match = _LABELED_STMT_RE.match(line)
             if label_match:
                 # This is a labeled statement
                 label = label_match.group(1)
                 rest = label_match.group(2)
                 # Format: label right-aligned in columns 1-5, statement starts column 7
-                line = f"{label:>5} {rest}"
+                line = label.rjust(5) + " " + rest
             else:
                 # Regular statement - ensure proper indentation
                 current_indent = len(line) - len(line.lstrip())
@@ -1019,19 +1173,25 @@ def _wrap_long_lines(code: str, max_length: int = 72, format_style: str = 'fixed
         
         # Skip short lines
         if len(line) <= max_length:
-            wrapped.append(line)
+            append(line)
             continue
         
-        # Line is too long - wrap it
+        # Line is too long - wrap it. The unwrapped rest is tracked as an offset
+        # into `text` (plus a flag for an inserted leading '&') so that only the
+        # emitted pieces are sliced, not the whole rest on every split.
         indent = len(line) - len(line.lstrip())
-        remaining = line.strip()
+        text = line.strip()
+        text_len = len(text)
+        start = 0
+        amp = 0
         first_line = True
        
         # Continue wrapping while remaining text (with indent) exceeds limit
-        while len(remaining) + indent > max_length:
+        while text_len - start + amp + indent > max_length:
+            rem_len = text_len - start + amp
             
             # Calculate where to split (leave room for indent and continuation)
-            if format_style == 'free':
+            if not fixed:
                 # F90: First line uses current indent, continuation uses space for ' &'
                 if first_line:
                     available = max_length - indent - 2  # Reserve 2 chars for ' &'
@@ -1047,51 +1207,126 @@ def _wrap_long_lines(code: str, max_length: int = 72, format_style: str = 'fixed
             # Find a good split position (prefer operators and commas)
             split_pos = available
             
-            # Try to split at logical positions
-            for char in [', ', ',', ' + ', ' - ', ' * ', '/', '(', ' .and. ', ' .or. ']:
-                pos = remaining[:split_pos].rfind(char)
-                if pos > 0:  # Found a split point
-                    split_pos = pos + len(char)
+            # Try to split at logical positions (slice semantics for the bound)
+            bound = split_pos if split_pos >= 0 else max(0, rem_len + split_pos)
+            for char in _SPLIT_CANDIDATES:
+                pos = text.rfind(char, start, start + bound - amp)
+                if pos >= 0 and pos - start + amp > 0:  # Found a split point
+                    split_pos = pos - start + amp + len(char)
                     break
             
             # If no good split point found, force split at available position
-            if split_pos >= len(remaining):
+            if split_pos >= rem_len:
                 split_pos = available
+            cut = split_pos if split_pos >= 0 else max(0, rem_len + split_pos)
+            cut = min(cut, rem_len)
+            
+            # Emit the head and advance past it (a pending '&' belongs to the head)
+            if amp and not cut:
+                head = ''
+            else:
+                head = text[start:start + cut - amp]
+                if amp:
+                    head = '&' + head
+                start += cut - amp
+                amp = 0
+                while start < text_len and text[start].isspace():
+                    start += 1
             
             # Generate continuation
-            if format_style == 'free':
+            if not fixed:
                 # Fortran 90 Free Format: & at end of line
-                wrapped.append(' ' * indent + remaining[:split_pos].rstrip() + ' &')
-                remaining = remaining[split_pos:].lstrip()
-                if remaining and not remaining.startswith('&'):
-                    remaining = '&' + remaining
+                append(' ' * indent + head.rstrip() + ' &')
+                if not amp and start < text_len and text[start] != '&':
+                    amp = 1
                 first_line = False
                 indent = 0  # Next line starts with ' &' (2 chars total)
             else:
                 # Fortran 77 Fixed Format: character in column 6
                 if first_line:
-                    wrapped.append(' ' * indent + remaining[:split_pos].rstrip())
+                    append(' ' * indent + head.rstrip())
                     first_line = False
                 else:
-                    wrapped.append('     &' + remaining[:split_pos].rstrip())
-                remaining = remaining[split_pos:].lstrip()
+                    append('     &' + head.rstrip())
         
         # Add the last part
-        if format_style == 'fixed' and not first_line:
-            wrapped.append('     &' + remaining)
+        remaining = text[start:]
+        if amp:
+            remaining = '&' + remaining
+        if fixed and not first_line:
+            append('     &' + remaining)
         else:
-            wrapped.append(' ' * indent + remaining)
+            append(' ' * indent + remaining)
     
     return '\n'.join(wrapped)
 
 
+def _iter_statements(statements):
+    """Yield the statements of a possibly nested list/tuple of statements in order."""
+    for stmt in statements:
+        if isinstance(stmt, (list, tuple)):
+            yield from _iter_statements(stmt)
+        else:
+            yield stmt
+
+
+def _generate_code(statements, line_ending="\n", max_line_length=None) -> str:
+    """Build the text genfor() writes, without touching the file system.
+    
+    Takes the same statements, line_ending and max_line_length as genfor()
+    and returns the Fortran source for the current global style, ending with
+    line_ending unless it is empty.
+    """
+    # Use global Fortran style
+    format_style = _fortran_style.format
+    
+    # Determine max line length based on global style
+    if max_line_length is None:
+        max_line_length = _fortran_style.max_line_length
+    
+    # Stream statements into one buffer, replacing label placeholders with
+    # sequential numbers (100, 200, 300, ...) and wrapping long lines per
+    # statement; the shared mapping keeps labels unique across statements
+    buf = io.StringIO()
+    labels = {}
+    separator = ""
+    for stmt in _iter_statements(statements):
+        if not stmt:
+            continue
+        if type(stmt) is not str:
+            stmt = str(stmt)
+        text = _replace_label_placeholders(stmt, labels)
+        if max_line_length > 0:
+            text = _wrap_long_lines(text, max_line_length, format_style)
+        buf.write(separator)
+        buf.write(text)
+        separator = line_ending
+    code = buf.getvalue()
+    
+    if code and not code.endswith(line_ending):
+        code += line_ending
+    return code
+
+
+def _file_mode(path) -> int:
+    """Return the permission bits genfor() gives the file it writes to path."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        # A new file gets the default mode minus the umask, which can only be
+        # read by setting it
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
 def genfor(fortranfile, statements, encoding="utf-8", line_ending="\n", 
            max_line_length=None):
     """genfor(fortranfile, statements, [encoding], [line_ending], [max_line_length])
 
     Write a list of macrofor statements/blocks to a Fortran file.
     
-    - Resets and assigns unique labels for DO-loops and other control structures.
+    - Assigns unique labels for DO-loops and other control structures.
     - Replaces label placeholders (__LABEL_N__) with sequential numbers (100, 200, 300, ...).
     - Automatically wraps long lines based on the current global Fortran style.
     - Raises clear exceptions on error.
@@ -1102,7 +1337,8 @@ def genfor(fortranfile, statements, encoding="utf-8", line_ending="\n",
 
     Args:
         fortranfile (str or Path): Output file path.
-        statements (list of str): List of Fortran code blocks/lines.
+        statements (list of str): List of Fortran code blocks/lines. Nested
+                                  lists/tuples of statements are flattened in order.
         encoding (str): File encoding (default: 'utf-8').
         line_ending (str): Line ending (default: '\\n').
         max_line_length (int, optional): Maximum line length. 
@@ -1126,34 +1362,31 @@ def genfor(fortranfile, statements, encoding="utf-8", line_ending="\n",
     from pathlib import Path
     
     try:
-        # Reset label counter at the start of file generation
-        _reset_label_counter()
-        
-        # Use global Fortran style
-        format_style = _fortran_style.format
-        
         filepath = Path(fortranfile)
-        # Ensure parent directory exists
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Join all statements with the specified line ending
-        code = line_ending.join(str(stmt) for stmt in statements if stmt)
-        
-        # Replace label placeholders with sequential numbers (100, 200, 300, ...)
-        code = _replace_label_placeholders(code)
-        
-        # Determine max line length based on global style
-        if max_line_length is None:
-            max_line_length = _fortran_style.max_line_length
-        
-        # Wrap long lines if needed
-        if max_line_length > 0:
-            code = _wrap_long_lines(code, max_line_length, format_style)
+        code = _generate_code(statements, line_ending, max_line_length)
         
-        # Write to file with proper encoding and line endings
-        with open(filepath, "w", encoding=encoding, newline="") as f:
-            f.write(code)
-            if code and not code.endswith(line_ending):
-                f.write(line_ending)
+        # Encode once and write the whole file in a single binary write. The
+        # data goes to a uniquely named temporary file next to the target that
+        # then replaces it, so a failed write never leaves a truncated file.
+        # A symlinked target is resolved first, so the link stays a link.
+        data = code.encode(encoding)
+        target = Path(os.path.realpath(filepath))
+        try:
+            fd, tmpname = tempfile.mkstemp(dir=target.parent, prefix=target.name, suffix=".tmp")
+        except FileNotFoundError:
+            # Parent directory does not exist yet: create it only in this case
+            target.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmpname = tempfile.mkstemp(dir=target.parent, prefix=target.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # mkstemp creates the file with mode 0600; give it the mode the
+            # target has, or the one a newly created file would get
+            os.chmod(tmpname, _file_mode(target))
+            os.replace(tmpname, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmpname)
+            raise
     except Exception as e:
         raise RuntimeError(f"Could not write Fortran file '{fortranfile}': {e}")
@@ -0,0 +1,25 @@
+"""Shared pytest fixtures."""
+import pytest
+
+from macrofor import api
+
+
+@pytest.fixture(autouse=True)
+def _restore_fortran_style():
+    """Undo set_fortran_style() calls made by a test."""
+    with api.fortran_style(api.get_fortran_style().format):
+        yield
+
+
+@pytest.fixture
+def gen_text():
+    """Return a function that renders statements like genfor() but in memory.
+
+    Usage: ``content = gen_text(code, 'f77', max_line_length=72)``. The text is
+    exactly what genfor() would write to the file, so tests that only inspect
+    the generated source do not need a temporary file.
+    """
+    def _run(code, style, **kwargs):
+        api.set_fortran_style(style)
+        return api._generate_code(code, **kwargs)
+    return _run
@@ -1,3 +1,5 @@
+import pytest
+
 from macrofor import api
 
 
@@ -35,3 +37,72 @@ def test_control_flow():
     assert it == 'if (x .gt. 0) then'
     g = api.if_goto_f('i .eq. 0', '100')
     assert g == 'if (i .eq. 0) goto 100'
+
+
+def test_replace_label_placeholders_order_of_appearance():
+    # Placeholder numbers follow creation order (inner loops first), but labels
+    # must follow order of appearance; __LABEL_1__ must not match __LABEL_10__
+    code = 'do __LABEL_10__ i\ndo __LABEL_1__ j\n__LABEL_1__ continue\n__LABEL_10__ continue'
+    out = api._replace_label_placeholders(code)
+    assert out == 'do 100 i\ndo 200 j\n200 continue\n100 continue'
+
+
+def test_helpers_accept_numeric_arguments():
+    assert api.gotof(100) == 'goto 100'
+    assert api.continuef(100) == '100 continue'
+    assert api.equalf('x', 1.5) == 'x = 1.5'
+    assert api.openf(10, 'data.txt', 'old') == "open(unit=10, file='data.txt', status='old')"
+    assert api.if_goto_f('i .eq. 0', 100) == 'if (i .eq. 0) goto 100'
+
+
+def test_helpers_accept_generators():
+    assert api.callf('foo', (name for name in ['a', 'b'])) == 'call foo(a, b)'
+    assert api.writef('6', None, iter(['x'])) == 'write (6) x'
+
+
+def test_helpers_accept_str_subclasses():
+    class Names(str):
+        pass
+    assert api.callf('x', Names('a, b')) == 'call x(a, b)'
+    assert api.declaref('implicit real*8', Names('a-h, o-z')) == 'implicit real*8(a-h,o-z)'
+
+
+@pytest.mark.parametrize('arg', [{'a', 'b'}, frozenset(['a']), b'ab', bytearray(b'ab')])
+def test_helpers_reject_unordered_and_byte_arguments(arg):
+    with pytest.raises(TypeError):
+        api.declaref('real', arg)
+
+
+def test_declaref_implicit_compacts_ranges_inside_list_items():
+    assert api.declaref('implicit real*8', ['a-h, o-z']) == 'implicit real*8(a-h,o-z)'
+    assert api.declaref('implicit integer', ['i-n']) == 'implicit integer(i-n)'
+
+
+def test_fortran_style_context_restores_previous_style():
+    api.set_fortran_style('f77')
+    with api.fortran_style('f90'):
+        assert api.commentf('x') == '!    x'
+    assert api.get_fortran_style().format == 'fixed'
+    assert api.commentf('x') == 'c     x'
+
+
+def test_style_attributes_changed_by_hand_take_effect():
+    api.set_fortran_style('f77')
+    style = api.get_fortran_style()
+    style.format = 'free'
+    style.comment_char = '!'
+    assert api.commentf('hi') == '!    hi'
+    assert api.subroutinef('s', ['x']) == '!\n! SUBROUTINE s\n!\nsubroutine s(x)'
+    assert api.if_then_m('x .gt. 0', ['a = 1']).split('\n')[1] == '  a = 1'
+
+
+def test_style_object_accepts_extra_attributes():
+    api.set_fortran_style('f77')
+    style = api.get_fortran_style()
+    style.project_tag = 'demo'
+    try:
+        with api.fortran_style('f90'):
+            assert api.get_fortran_style().project_tag == 'demo'
+        assert style.format == 'fixed'
+    finally:
+        del style.project_tag
@@ -1,4 +1,5 @@
 """Unit tests for genfor function."""
+import os
 import pytest
 from pathlib import Path
 from macrofor.api import (
@@ -20,7 +21,7 @@ class TestGenforBasic:
             ])
         ]
         genfor(output_file, statements)
-        assert output_file.exists()
+        assert output_file.is_file()
     
     def test_genfor_writes_content(self, tmp_path):
         """Test that genfor writes the correct content."""
@@ -43,8 +44,77 @@ class TestGenforBasic:
         output_file = tmp_path / "subdir" / "nested" / "test.f90"
         statements = [equalf("x", "1")]
         genfor(output_file, statements)
-        assert output_file.exists()
-        assert output_file.parent.exists()
+        # One stat: a regular file implies its parent directories exist
+        assert output_file.is_file()
+
+    
+    def test_genfor_flattens_nested_statements(self, tmp_path):
+        """Test that nested lists/tuples of statements are written in order."""
+        output_file = tmp_path / "nested_statements.f90"
+        statements = [
+            equalf("a", "1"),
+            [equalf("b", "2"), (equalf("c", "3"),)],
+            equalf("d", "4"),
+        ]
+        genfor(output_file, statements)
+        content = output_file.read_text()
+        assert content.index("a = 1") < content.index("b = 2")
+        assert content.index("b = 2") < content.index("c = 3")
+        assert content.index("c = 3") < content.index("d = 4")
+
+    def test_genfor_writes_generated_code(self, tmp_path, gen_text):
+        """Test that the file holds exactly the in-memory rendering used by the tests."""
+        output_file = tmp_path / "same_as_memory.f"
+        statements = [dom("i", "1", "10", [equalf("x(i)", "i")])]
+        expected = gen_text(statements, "f77", line_ending="\r\n")
+        genfor(output_file, statements, line_ending="\r\n")
+        # Compare bytes so the line endings on disk are checked as well
+        assert output_file.read_bytes() == expected.encode("utf-8")
+
+    def test_genfor_leaves_sibling_files_alone(self, tmp_path):
+        """Test that genfor writes only the target file."""
+        output_file = tmp_path / "out.f"
+        sibling = tmp_path / "out.f.tmp"
+        sibling.write_text("user data")
+        genfor(output_file, [equalf("x", "1")])
+        assert sibling.read_text() == "user data"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["out.f", "out.f.tmp"]
+
+    def test_genfor_writes_through_symlink(self, tmp_path):
+        """Test that genfor writes to the file a symlinked target points to."""
+        real_file = tmp_path / "real.f"
+        real_file.write_text("old")
+        link = tmp_path / "link.f"
+        try:
+            link.symlink_to(real_file)
+        except (OSError, NotImplementedError):
+            pytest.skip("symlinks are not available")
+        genfor(link, [equalf("x", "1")])
+        assert link.is_symlink()
+        assert "x = 1" in real_file.read_text()
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX permission bits")
+    def test_genfor_keeps_file_mode(self, tmp_path):
+        """Test that replacing an existing file keeps its permissions."""
+        output_file = tmp_path / "mode.f"
+        output_file.write_text("old")
+        output_file.chmod(0o640)
+        genfor(output_file, [equalf("x", "1")])
+        assert output_file.stat().st_mode & 0o777 == 0o640
+
+    def test_genfor_failed_write_keeps_old_file(self, tmp_path, monkeypatch):
+        """Test that a failed write leaves the old file and no temporary file."""
+        output_file = tmp_path / "keep.f"
+        output_file.write_text("old")
+
+        def fail(src, dst):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "replace", fail)
+        with pytest.raises(RuntimeError):
+            genfor(output_file, [equalf("x", "1")])
+        assert output_file.read_text() == "old"
+        assert [p.name for p in tmp_path.iterdir()] == ["keep.f"]
 
 
 class TestGenforLinearSystem:
@@ -218,35 +288,35 @@ class TestGenforEncodingLineEndings:
         assert "Übung" in content
         assert "Überprüfung" in content
     
-    def test_genfor_windows_line_endings(self, tmp_path):
+    def test_genfor_windows_line_endings(self, gen_text):
         """Test that genfor respects Windows line endings (CRLF)."""
-        output_file = tmp_path / "crlf_test.f90"
         statements = [
             programm("test", [
                 equalf("x", "1.0d0"),
                 equalf("y", "2.0d0")
             ])
         ]
-        genfor(output_file, statements, line_ending="\r\n")
-        
-        # Read in binary mode to check line endings
-        content_bytes = output_file.read_bytes()
-        assert b"\r\n" in content_bytes, "Expected CRLF line endings"
+        content = gen_text(statements, "f77", line_ending="\r\n")
+        assert "\r\n" in content, "Expected CRLF line endings"
     
-    def test_genfor_unix_line_endings(self, tmp_path):
+    def test_genfor_unix_line_endings(self, gen_text):
         """Test that genfor respects Unix line endings (LF only)."""
-        output_file = tmp_path / "lf_test.f90"
         statements = [
             programm("test", [
                 equalf("x", "1.0d0")
             ])
         ]
-        genfor(output_file, statements, line_ending="\n")
-        
-        # Read in binary mode to check line endings
-        content_bytes = output_file.read_bytes()
-        assert b"\r\n" not in content_bytes, "Expected LF-only line endings"
-        assert b"\n" in content_bytes, "Expected LF line endings"
+        content = gen_text(statements, "f77", line_ending="\n")
+        assert "\r\n" not in content, "Expected LF-only line endings"
+        assert "\n" in content, "Expected LF line endings"
+
+    def test_genfor_crlf_after_wrapped_statement(self, gen_text):
+        """Test that a wrapped statement is still followed by a CRLF line ending."""
+        long_expr = " + ".join(f"term{i}" for i in range(40))
+        statements = [equalf("x", long_expr), equalf("y", "1")]
+        content = gen_text(statements, "f90", line_ending="\r\n")
+        assert " &\n&" in content, "Expected the long statement to be wrapped"
+        assert content.endswith("term39\r\ny = 1\r\n")
 
 
 class TestGenforComplexSubroutine:
@@ -362,6 +432,40 @@ class TestGenforLabelHandling:
         # No label placeholders should remain
         assert "__LABEL_" not in content
     
+    def test_genfor_labels_continue_across_statements(self, tmp_path):
+        """
+        Test that labels stay unique when loops are passed as separate top-level statements.
+        """
+        output_file = tmp_path / "labels_across_statements.f90"
+        
+        statements = [
+            dom("i", "1", "5", [equalf("a(i)", "i")]),
+            dom("j", "1", "5", [equalf("b(j)", "j")]),
+        ]
+        genfor(output_file, statements)
+        
+        content = output_file.read_text()
+        assert "do 100 i" in content
+        assert "do 200 j" in content
+        assert "200 continue" in content
+        assert "__LABEL_" not in content
+
+    def test_genfor_does_not_reuse_placeholders(self, tmp_path):
+        """
+        Test that a genfor call between building two loops does not make them share a label.
+        """
+        first = dom("i", "1", "5", [equalf("a(i)", "i")])
+        genfor(tmp_path / "other.f90", [dom("k", "1", "2", [equalf("c(k)", "k")])])
+        second = dom("j", "1", "5", [equalf("b(j)", "j")])
+
+        output_file = tmp_path / "no_reuse.f90"
+        genfor(output_file, [first, second])
+
+        content = output_file.read_text()
+        assert "do 100 i" in content
+        assert "do 200 j" in content
+        assert "200 continue" in content
+
     def test_genfor_nested_labels(self, tmp_path):
         """
         Test that nested DO loops get unique labels (100, 200).
@@ -4,6 +4,8 @@
 import sys
 import pathlib
 import inspect
+import io
+import re
 
 # Ensure project root is on sys.path so `import macrofor` works when running the
 # script from the repository root or tools directory. This avoids requiring
@@ -14,66 +16,123 @@ sys.path.insert(0, str(project_root))
 from macrofor import api
 
 
+# A section header line ("Args:", "Returns:" or "Example:", possibly followed
+# by text that is dropped) including its line break. The capturing group makes
+# split() return the section names between the section bodies.
+_SECTION_RE = re.compile(r'^[ \t]*(Args|Returns|Example):.*(?:\n|$)', re.MULTILINE)
+_SECTION_KEYS = {"Args": "args", "Returns": "returns", "Example": "example"}
+
+
 def extract_docstring_parts(docstring: str) -> dict:
     """Parse docstring into sections: description, args, returns, example."""
     if not docstring:
         return {"description": "", "args": "", "returns": "", "example": ""}
     
-    lines = docstring.strip().split('\n')
-    parts = {
-        "description": "",
-        "args": "",
-        "returns": "",
-        "example": ""
-    }
-    
-    current_section = "description"
-    description_lines = []
-    args_lines = []
-    returns_lines = []
-    example_lines = []
-    
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith("Args:"):
-            current_section = "args"
-            continue
-        elif stripped.startswith("Returns:"):
-            current_section = "returns"
-            continue
-        elif stripped.startswith("Example:"):
-            current_section = "example"
-            continue
-        
-        if current_section == "description":
-            description_lines.append(stripped)
-        elif current_section == "args":
-            args_lines.append(stripped)
-        elif current_section == "returns":
-            returns_lines.append(stripped)
-        elif current_section == "example":
-            example_lines.append(stripped)
+    # Split once at the section headers instead of testing every line
+    pieces = _SECTION_RE.split(docstring.strip())
+    sections = {"description": [], "args": [], "returns": [], "example": []}
+    keys = ["description"] + [_SECTION_KEYS[name] for name in pieces[1::2]]
+    bodies = pieces[0::2]
+    last = len(bodies) - 1
+    for i, (key, body) in enumerate(zip(keys, bodies)):
+        lines = body.split('\n')
+        if i < last or not body:
+            # The line break before the next header (or a header ending the
+            # docstring) does not start another line
+            lines.pop()
+        sections[key].extend(line.strip() for line in lines)
     
     # preserve line breaks in description so docstring-specified examples
     # or spec-like blocks remain intact for detailed rendering
-    parts["description"] = '\n'.join(description_lines).strip()
-    parts["args"] = ' '.join(args_lines).strip()
-    parts["returns"] = ' '.join(returns_lines).strip()
-    parts["example"] = '\n'.join(example_lines).strip()
-    
-    return parts
+    return {
+        "description": '\n'.join(sections["description"]).strip(),
+        "args": ' '.join(sections["args"]).strip(),
+        "returns": ' '.join(sections["returns"]).strip(),
+        "example": '\n'.join(sections["example"]).strip(),
+    }
 
 
-    
+# Detail sections shown for functions without a docstring; parsed once
+_NO_DOC_PARTS = extract_docstring_parts("No documentation")
+
+
+def _function_info(funcs) -> list:
+    """Introspect each (name, func) once for both the table and the details.
+    
+    Returns sorted (name, signature, table description, detail parts) tuples.
+    The table uses an empty description for undocumented functions, the
+    detailed reference says "No documentation".
+    """
+    info = []
+    for name, func in sorted(funcs):
+        sig = str(inspect.signature(func))
+        docstring = func.__doc__
+        if not docstring:
+            info.append((name, sig, "", _NO_DOC_PARTS))
+            continue
+        parts = extract_docstring_parts(docstring)
+        # collapse description lines into a single short line for the table
+        description = ' '.join(l.strip() for l in parts["description"].splitlines() if l.strip())
+        if len(description) > 120:
+            description = description[:117] + "..."
+        info.append((name, sig, description, parts))
+    return info
+
+
+def _emit_table(emit, title: str, info: list):
+    """Write the summary table of one group of functions."""
+    emit(f"## {title}\n")
+    emit("\n")
+    emit("| Function | Signature | Description |\n")
+    emit("|----------|-----------|-------------|\n")
+    for name, sig, description, _ in info:
+        emit(f"| `{name}` | `{name}{sig}` | {description} |\n")
+
+
+def _emit_details(emit, title: str, info: list):
+    """Write the detailed reference of one group of functions."""
+    emit(f"### {title}\n")
+    emit("\n")
+    for name, sig, _, parts in info:
+        emit(f"#### `{name}{sig}`\n")
+        emit("\n")
+        if parts["description"]:
+            emit(f"{parts['description']}\n")
+            emit("\n")
+        if parts["args"]:
+            emit("**Args:**\n")
+            emit(f"{parts['args']}\n")
+            emit("\n")
+        if parts["returns"]:
+            emit("**Returns:**\n")
+            emit(f"{parts['returns']}\n")
+            emit("\n")
+        # Render example block from docstring. If no explicit Example: is
+        # present but the description itself contains multiple lines, show
+        # the description as a Fortran example block.
+        if parts["example"]:
+            example_text = parts["example"].replace('\\n', '\n').replace('\\nend', '\nend')
+            emit("**Example:**\n")
+            emit("```fortran\n")
+            emit(f"{example_text}\n")
+            emit("```\n")
+            emit("\n")
+        elif '\n' in parts["description"]:
+            emit("**Example:**\n")
+            emit("```fortran\n")
+            emit(f"{parts['description']}\n")
+            emit("```\n")
+            emit("\n")
 
 
 def generate_cheatsheet():
     """Generate cheatsheet markdown from api.py."""
-    output = []
-    output.append("# MACROFOR Quick Reference")
-    output.append("")
-    output.append("Auto-generated from `macrofor/api.py` docstrings.")
-    output.append("")
+    buf = io.StringIO()
+    emit = buf.write
+    emit("# MACROFOR Quick Reference\n")
+    emit("\n")
+    emit("Auto-generated from `macrofor/api.py` docstrings.\n")
+    emit("\n")
     
     # The generator now relies entirely on docstrings in `api.py`.
 
@@ -90,120 +149,25 @@ def generate_cheatsheet():
         elif name.endswith('m'):
             macro_funcs.append((name, obj))
     
-    # Single-instruction functions table
-    output.append("## Single-Instruction Functions (*f)")
-    output.append("")
-    output.append("| Function | Signature | Description |")
-    output.append("|----------|-----------|-------------|")
+    # Signatures and docstrings are parsed once and shared by both passes
+    single_instr_info = _function_info(single_instr_funcs)
+    macro_info = _function_info(macro_funcs)
     
-    for name, func in sorted(single_instr_funcs):
-        sig = str(inspect.signature(func))
-        docstring = func.__doc__ or ""
-        parts = extract_docstring_parts(docstring)
-        # collapse description lines into a single short line for the table
-        description = ' '.join(l.strip() for l in parts["description"].splitlines() if l.strip())
-        if len(description) > 120:
-            description = description[:117] + "..."
-        output.append(f"| `{name}` | `{name}{sig}` | {description} |")
-    
-    output.append("")
-    output.append("## Macro Functions (*m)")
-    output.append("")
-    output.append("| Function | Signature | Description |")
-    output.append("|----------|-----------|-------------|")
-    
-    for name, func in sorted(macro_funcs):
-        sig = str(inspect.signature(func))
-        docstring = func.__doc__ or ""
-        parts = extract_docstring_parts(docstring)
-        # collapse description lines into a single short line for the table
-        description = ' '.join(l.strip() for l in parts["description"].splitlines() if l.strip())
-        if len(description) > 120:
-            description = description[:117] + "..."
-        output.append(f"| `{name}` | `{name}{sig}` | {description} |")
-    
-    output.append("")
-    output.append("---")
-    output.append("")
-    output.append("## Detailed Function Reference")
-    output.append("")
-    
-    # Single-instruction functions detail
-    output.append("### Single-Instruction Functions (*f)")
-    output.append("")
-    
-    for name, func in sorted(single_instr_funcs):
-        sig = str(inspect.signature(func))
-        docstring = func.__doc__ or "No documentation"
-        parts = extract_docstring_parts(docstring)
-        
-        output.append(f"#### `{name}{sig}`")
-        output.append("")
-        if parts["description"]:
-            output.append(f"{parts['description']}")
-            output.append("")
-        if parts["args"]:
-            output.append("**Args:**")
-            output.append(f"{parts['args']}")
-            output.append("")
-        if parts["returns"]:
-            output.append("**Returns:**")
-            output.append(f"{parts['returns']}")
-            output.append("")
-        # Render example block from docstring. If no explicit Example: is
-        # present but the description itself contains multiple lines, show
-        # the description as a Fortran example block.
-        if parts["example"]:
-            example_text = parts["example"].replace('\\n', '\n').replace('\\nend', '\nend')
-            output.append("**Example:**")
-            output.append("```fortran")
-            output.append(example_text)
-            output.append("```")
-            output.append("")
-        elif '\n' in parts["description"]:
-            output.append("**Example:**")
-            output.append("```fortran")
-            output.append(parts["description"])
-            output.append("```")
-            output.append("")
+    _emit_table(emit, "Single-Instruction Functions (*f)", single_instr_info)
+    emit("\n")
+    _emit_table(emit, "Macro Functions (*m)", macro_info)
     
-    # Macro functions detail
-    output.append("### Macro Functions (*m)")
-    output.append("")
+    emit("\n")
+    emit("---\n")
+    emit("\n")
+    emit("## Detailed Function Reference\n")
+    emit("\n")
     
-    for name, func in sorted(macro_funcs):
-        sig = str(inspect.signature(func))
-        docstring = func.__doc__ or "No documentation"
-        parts = extract_docstring_parts(docstring)
-        
-        output.append(f"#### `{name}{sig}`")
-        output.append("")
-        if parts["description"]:
-            output.append(f"{parts['description']}")
-            output.append("")
-        if parts["args"]:
-            output.append("**Args:**")
-            output.append(f"{parts['args']}")
-            output.append("")
-        if parts["returns"]:
-            output.append("**Returns:**")
-            output.append(f"{parts['returns']}")
-            output.append("")
-        if parts["example"]:
-            example_text = parts["example"].replace('\\n', '\n').replace('\\nend', '\nend')
-            output.append("**Example:**")
-            output.append("```fortran")
-            output.append(example_text)
-            output.append("```")
-            output.append("")
-        elif '\n' in parts["description"]:
-            output.append("**Example:**")
-            output.append("```fortran")
-            output.append(parts["description"])
-            output.append("```")
-            output.append("")
+    _emit_details(emit, "Single-Instruction Functions (*f)", single_instr_info)
+    _emit_details(emit, "Macro Functions (*m)", macro_info)
     
-    return "\n".join(output)
+    # Every emitted line ends with a line break; the document does not
+    return buf.getvalue()[:-1]
 
 
 def main():
@@ -213,6 +177,12 @@ def main():
     docs_dir = pathlib.Path(__file__).parent.parent / "docs"
     output_file = docs_dir / "MACROFOR_CHEATSHEET.md"
     
+    # Compare contents rather than mtimes: a git checkout gives every file
+    # the same fresh mtime, so a stale cheatsheet would look up to date
+    if output_file.exists() and output_file.read_text() == cheatsheet:
+        print(f"✓ {output_file.resolve()} is up to date")
+        return
+    
     output_file.write_text(cheatsheet)
     print(f"✓ Generated {output_file.resolve()}")
 